@@ -1,6 +1,23 @@
+import atexit
+import csv
+import gzip
+import io
 import sqlite3
 import json
-from flask import Flask, jsonify, request, g
+import orjson
+import msgspec
+from msgspec import UNSET, UnsetType
+import queue
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from itertools import chain, count, groupby
+from operator import attrgetter, itemgetter
+from typing import Annotated
+from flask import Flask, request, g, abort, stream_with_context
+from flask.json.provider import JSONProvider
+from waitress import serve
 from datetime import datetime
 import os
 import sys # <-- NEW: Need sys and os for path discovery
@@ -32,37 +49,304 @@ def get_database_path():
 # Assign the absolute, determined path to the global DATABASE variable
 DATABASE = get_database_path() # <-- UPDATED: Now calls the function
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify(), request.get_json() and error bodies use it too."""
+
+    # Same knobs as Flask's DefaultJSONProvider, pinned off: output is never key-sorted or
+    # indented, even when the debug server is used (debug otherwise pretty-prints jsonify)
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        # indent/sort_keys kwargs are deliberately ignored; orjson is called without OPT_INDENT_2/OPT_SORT_KEYS
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.config['DEBUG'] = False
 
 # --- DATABASE CONNECTION UTILITIES ---
 
-def get_db_connection():
-    """Returns a new SQLite database connection with row factory for dictionary access."""
+# Number of long-lived read-only connections kept open and shared across requests;
+# writes go through one extra dedicated writer connection
+POOL_SIZE = 8
+
+# Seconds a connection waits on a locked database (sqlite3_busy_timeout) before raising
+# "database is locked"; covers a writer waiting for another BEGIN IMMEDIATE to finish
+BUSY_TIMEOUT = 5.0
+
+# Per-connection settings, applied once when a pooled connection is opened.
+# journal_mode is persistent in the database file, so init_db() sets WAL once instead.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA cache_size = -32000;",
+    "PRAGMA mmap_size = 268435456;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA wal_autocheckpoint = 1000;",
+)
+
+def create_db_connection(read_only=False):
+    """Opens a new SQLite connection configured for pooled, cross-thread use."""
     # NOTE: DATABASE variable now contains the full AppData path, fixing the read-only error
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+    # Rows stay plain tuples; read endpoints build dicts via fetch_dicts() only where JSON needs them
+    # isolation_level=None: autocommit for reads; writes open their own transaction via transaction()
+    # cached_statements: room for every SQL_* constant plus the per-field-set UPDATE/IN variants
+    conn = sqlite3.connect(
+        DATABASE, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None, cached_statements=256
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    if read_only:
+        # Guards the read pool: any write attempted on it fails instead of taking the write lock
+        conn.execute("PRAGMA query_only = ON;")
     return conn
 
-@app.teardown_appcontext
-def close_connection(exception):
-    """Closes the database connection at the end of the request."""
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+# SQLite allows one writer at a time, so write transactions queue here for the single writer
+# connection rather than spinning in SQLite's busy handler; readers never wait behind them (WAL)
+_write_pool = queue.Queue(maxsize=1)
+_write_pool.put(create_db_connection())
+# Bounded pool of open read-only connections; avoids re-opening the DB file on every request
+_read_pool = queue.Queue(maxsize=POOL_SIZE)
+for _ in range(POOL_SIZE):
+    _read_pool.put(create_db_connection(read_only=True))
+
+@contextmanager
+def borrow_conn(write=False):
+    """Borrows a read-only connection (or the writer, if write) and returns it once the block exits."""
+    pool = _write_pool if write else _read_pool
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        # Never hand a connection back with a half-finished transaction on it
+        if conn.in_transaction:
+            conn.rollback()
+        pool.put(conn)
+
+@contextmanager
+def transaction(conn):
+    """Runs the block in one BEGIN IMMEDIATE transaction: commits on exit, rolls back if it raises."""
+    # The write lock is taken up front, so reads inside the block (stock checks, existence
+    # checks) see the same state the writes apply to, and the lock never upgrades mid-way
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+@atexit.register
+def close_pool():
+    """Closes the pooled connections on interpreter shutdown so the WAL is checkpointed cleanly."""
+    for pool in (_read_pool, _write_pool):
+        while True:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                break
+            # Refreshes planner statistics for tables this connection queried heavily
+            # (optimize may write sqlite_stat1, so lift the read-only guard first)
+            conn.execute("PRAGMA query_only = OFF;")
+            conn.execute("PRAGMA optimize;")
+            conn.close()
+
+def fetch_dicts(cursor):
+    """Returns the cursor's remaining rows as dicts, computing the column keys only once."""
+    keys = tuple(column[0] for column in cursor.description)
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+# --- JSON UTILITIES ---
+
+def ojsonify(obj, status=200):
+    """Serializes obj with orjson straight to response bytes (skips the provider's str round-trip)."""
+    return app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
+
+def decode_request(struct_type):
+    """Parses and validates the request body into struct_type in one pass, rejecting bad payloads with a 400."""
+    try:
+        return msgspec.json.decode(request.get_data(), type=struct_type)
+    except msgspec.DecodeError as e:
+        # ValidationError is a DecodeError too, so this covers malformed JSON and schema mismatches
+        abort(ojsonify({"error": f"Invalid request body: {e}"}, 400))
+
+def transactional(body=None, errors=None):
+    """Decorates a write endpoint to run in one pooled-connection transaction.
+
+    The endpoint gets a cursor as its first argument, then the decoded body (when body names a
+    request struct) and its URL arguments. Returning commits; raising rolls back and answers with
+    the (status, message) that errors maps the exception type to, formatted with e. IntegrityError
+    defaults to 400 and anything else to 500.
+    """
+    # Endpoint-specific entries are checked first, so they can override the defaults
+    error_map = [*(errors or {}).items(), (sqlite3.IntegrityError, (400, "Data integrity error: {e}"))]
+
+    def decorator(endpoint):
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            # Decoded before borrowing, so a bad payload never takes the write lock
+            if body is not None:
+                args = (decode_request(body), *args)
+            with borrow_conn(write=True) as conn:
+                try:
+                    with transaction(conn):
+                        return endpoint(conn.cursor(), *args, **kwargs)
+                except Exception as e:
+                    # Rolled back: drop the row count and ETag changes queued for after_request
+                    g.pop('row_count_deltas', None)
+                    g.pop('stale_resources', None)
+                    for exc_type, (status, message) in error_map:
+                        if isinstance(e, exc_type):
+                            return ojsonify({"error": message.format(e=e)}, status)
+                    return ojsonify({"error": str(e)}, 500)
+        return wrapper
+    return decorator
+
+# --- RESPONSE COMPRESSION ---
+
+# JSON bodies below this size are sent as-is; gzip framing would outweigh the saving
+COMPRESS_MIN_SIZE = 1024
+# Low level: the repeated keys in list payloads compress well even at fast settings
+COMPRESS_LEVEL = 4
+
+def accepts_gzip():
+    """Reports whether the current request advertises gzip in Accept-Encoding."""
+    return 'gzip' in request.accept_encodings
+
+def mark_gzipped(response):
+    """Sets the headers for a gzip-encoded body and weakens a strong ETag to match."""
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # The encoded bytes differ from the identity body, so a strong validator would be wrong
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def gzip_stream(chunks):
+    """Gzips a stream of byte chunks incrementally, yielding compressed output as it fills."""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    """Gzips buffered JSON responses of COMPRESS_MIN_SIZE or more for clients that accept it."""
+    if response.status_code != 200 or response.mimetype != 'application/json':
+        return response
+    # Whether or not this body ends up compressed, its encoding depends on Accept-Encoding,
+    # so shared caches must not serve an identity copy to a gzip client (or the reverse)
+    response.vary.add('Accept-Encoding')
+    # Streamed bodies are compressed by their endpoint via gzip_stream()
+    if (response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not accepts_gzip()):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    # mtime=0 keeps the output deterministic for identical bodies
+    response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0))
+    return mark_gzipped(response)
+
+# --- REQUEST SCHEMAS ---
+
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+PositiveInt = Annotated[int, msgspec.Meta(gt=0)]
+
+class PlantIn(msgspec.Struct):
+    """Body of POST /plants."""
+    name: NonEmptyStr
+    category: NonEmptyStr
+    price: float
+    quantity: int = 0
+    supplier_id: int | None = None
+
+class SupplierIn(msgspec.Struct):
+    """Body of POST /suppliers."""
+    name: NonEmptyStr
+    email: NonEmptyStr
+    contact_person: str | None = None
+    phone: str | None = None
+    address: str | None = None
 
-def dict_factory(cursor, row):
-    """Custom row factory to return rows as standard Python dictionaries."""
-    d = {}
-    for idx, col in enumerate(cursor.description):
-        d[col[0]] = row[idx]
-    return d
+class PlantUpdateIn(msgspec.Struct):
+    """Body of PUT /plants/<id>; omitted fields are left unchanged."""
+    name: NonEmptyStr | UnsetType = UNSET
+    category: NonEmptyStr | UnsetType = UNSET
+    price: float | UnsetType = UNSET
+    quantity: int | UnsetType = UNSET
+    supplier_id: int | None | UnsetType = UNSET
+
+class SupplierUpdateIn(msgspec.Struct):
+    """Body of PUT /suppliers/<id>; omitted fields are left unchanged."""
+    name: NonEmptyStr | UnsetType = UNSET
+    email: NonEmptyStr | UnsetType = UNSET
+    contact_person: str | None | UnsetType = UNSET
+    phone: str | None | UnsetType = UNSET
+    address: str | None | UnsetType = UNSET
+
+class RestockIn(msgspec.Struct):
+    """Body of POST /inventory/restock; a negative quantity is a write-off."""
+    product_id: PositiveInt
+    quantity: int
+
+class OrderItemIn(msgspec.Struct):
+    """One line of an order."""
+    product_id: PositiveInt
+    quantity: PositiveInt
+
+class OrderIn(msgspec.Struct):
+    """Body of POST /orders."""
+    customer_name: NonEmptyStr
+    items: Annotated[list[OrderItemIn], msgspec.Meta(min_length=1)]
+
+def sent_fields(struct):
+    """Returns the names of the fields present in the decoded body, in declaration order."""
+    # Declaration order (not client key order) keeps one SQL string per field set
+    return tuple(field for field in struct.__struct_fields__ if getattr(struct, field) is not UNSET)
+
+# Bump whenever the DDL in init_db() changes; stored in the file as PRAGMA user_version
+SCHEMA_VERSION = 3
+
+# Trigram full-text index over plant name/category, kept in sync with products by triggers.
+# Optional: needs FTS5 with the trigram tokenizer (SQLite 3.34+), otherwise search stays on LIKE.
+PLANT_SEARCH_SCHEMA = """
+    BEGIN;
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, category, content='products', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, category) VALUES (new.id, new.name, new.category);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, category ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO products_fts (rowid, name, category) VALUES (new.id, new.name, new.category);
+    END;
+    -- Index rows that existed before the table was created
+    INSERT INTO products_fts (products_fts) VALUES ('rebuild');
+    COMMIT;
+"""
 
 def init_db():
     """Initializes the database schema."""
-    conn = get_db_connection()
-    conn.execute("PRAGMA foreign_keys = ON;")
-    
-    with conn:
+    with borrow_conn(write=True) as conn:
+        # Already-initialized files skip the DDL script (and its schema lock) entirely
+        if conn.execute("PRAGMA user_version;").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        # WAL lets readers run alongside the single writer; it only needs setting once per file
+        conn.execute("PRAGMA journal_mode = WAL;")
         conn.executescript("""
             -- Suppliers Table
             CREATE TABLE IF NOT EXISTS suppliers (
@@ -104,444 +388,648 @@ def init_db():
                 FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
                 FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT
             );
+
+            -- Indexes for foreign-key lookups, joins and the order history sort
+            CREATE INDEX IF NOT EXISTS idx_products_supplier ON products(supplier_id);
+            -- Search is '%term%' LIKE (never index-assisted) or FTS5, and name lookups use the UNIQUE autoindex
+            DROP INDEX IF EXISTS idx_products_name_nocase;
+            -- Covering: order history and order deletion read every item column they need from the index
+            DROP INDEX IF EXISTS idx_order_items_order;
+            CREATE INDEX IF NOT EXISTS idx_order_items_order_covering
+                ON order_items(order_id, product_id, quantity, price_at_sale);
+            CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+            CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date DESC);
         """)
-    conn.close()
+        try:
+            conn.executescript(PLANT_SEARCH_SCHEMA)
+        except sqlite3.OperationalError:
+            # No FTS5/trigram in this SQLite build; plant search keeps using LIKE
+            if conn.in_transaction:
+                conn.rollback()
+        # Refresh planner statistics so the joins above pick the new indexes
+        conn.execute("ANALYZE;")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+
+init_db()
 
-with app.app_context():
-    init_db()
+def has_plant_search_index():
+    """Reports whether the products_fts index exists and this SQLite build can query it."""
+    with borrow_conn() as conn:
+        try:
+            conn.execute("SELECT 1 FROM products_fts LIMIT 0")
+        except sqlite3.OperationalError:
+            return False
+    return True
 
-# --- HELPER FUNCTIONS ---
+PLANT_SEARCH_USES_FTS = has_plant_search_index()
+# Trigram queries need at least 3 characters; shorter terms fall back to LIKE
+FTS_MIN_TERM_LENGTH = 3
 
-def get_products_with_supplier_name(cursor, search_term=None):
-    """Fetches all products, joining with supplier name, optionally filtered by search term."""
-    query = """
-        SELECT 
-            p.*, 
-            s.name AS supplier_name 
-        FROM products p
-        LEFT JOIN suppliers s ON p.supplier_id = s.id
+# --- SQL STATEMENTS ---
+# Kept as module-level constants so identical SQL text hits sqlite3's per-connection statement cache.
+
+SQL_GET_PLANTS = """
+    SELECT 
+        p.id, p.name, p.category, p.price, p.quantity, p.supplier_id, s.name AS supplier_name 
+    FROM products p
+    LEFT JOIN suppliers s ON p.supplier_id = s.id
+"""
+SQL_SEARCH_PLANTS = SQL_GET_PLANTS + " WHERE p.name LIKE ? OR p.category LIKE ?"
+# CROSS JOIN pins products_fts as the outer loop: matches come from the index, then one
+# rowid lookup per hit, instead of scanning products and probing the match list
+SQL_SEARCH_PLANTS_FTS = """
+    SELECT 
+        p.id, p.name, p.category, p.price, p.quantity, p.supplier_id, s.name AS supplier_name 
+    FROM products_fts f
+    CROSS JOIN products p ON p.id = f.rowid
+    LEFT JOIN suppliers s ON p.supplier_id = s.id
+    WHERE products_fts MATCH ?
+"""
+SQL_INSERT_PRODUCT = "INSERT INTO products (name, category, price, quantity, supplier_id) VALUES (?, ?, ?, ?, ?)"
+# Builds the SQL_INSERT_PRODUCT parameter tuple from a PlantIn in one C-level call
+PLANT_INSERT_PARAMS = attrgetter('name', 'category', 'price', 'quantity', 'supplier_id')
+SQL_DELETE_PRODUCT = "DELETE FROM products WHERE id = ?"
+SQL_COUNT_PRODUCTS = "SELECT COUNT(*) FROM products"
+
+SQL_LIST_SUPPLIERS = "SELECT * FROM suppliers"
+# A duplicate name or email selects no row, so nothing is inserted (rowcount 0) and nothing is
+# written: unlike ON CONFLICT DO NOTHING, no AUTOINCREMENT id is used up and no IntegrityError raised
+SQL_INSERT_SUPPLIER = """
+    INSERT INTO suppliers (name, email, contact_person, phone, address)
+    SELECT ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM suppliers WHERE name = ? OR email = ?)
+"""
+# The name and email repeat at the end for the NOT EXISTS probe
+SUPPLIER_INSERT_PARAMS = attrgetter('name', 'email', 'contact_person', 'phone', 'address', 'name', 'email')
+# Only run after a skipped insert, to name the UNIQUE column that conflicted (name, else email)
+SQL_SUPPLIER_NAME_TAKEN = "SELECT 1 FROM suppliers WHERE name = ?"
+# Only run on the 409/404 path, where the 409 message reports how many plants are linked
+SQL_COUNT_SUPPLIER_PRODUCTS = "SELECT COUNT(*) FROM products WHERE supplier_id = ?"
+# Deletes only a supplier no plant links to; the NOT EXISTS existence probe stops at the first
+# linked product, so the happy path never counts
+SQL_DELETE_UNLINKED_SUPPLIER = """
+    DELETE FROM suppliers
+    WHERE id = :supplier_id
+      AND NOT EXISTS (SELECT 1 FROM products WHERE supplier_id = :supplier_id)
+"""
+SQL_COUNT_SUPPLIERS = "SELECT COUNT(*) FROM suppliers"
+
+SQL_RESTOCK = "UPDATE products SET quantity = quantity + ? WHERE id = ?"
+SQL_RESTOCK_RETURNING = SQL_RESTOCK + " RETURNING quantity"
+SQL_GET_PRODUCT_QUANTITY = "SELECT quantity FROM products WHERE id = ?"
+
+# UPDATE ... RETURNING needs SQLite 3.35+; older builds fall back to UPDATE followed by SELECT
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+# UPDATE ... FROM needs SQLite 3.33+; older builds fall back to one UPDATE per product
+SQLITE_HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+# Default cap on bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER); it was 999 before 3.32
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+SQL_INSERT_ORDER = "INSERT INTO orders (customer_name, date, total) VALUES (?, ?, ?)"
+SQL_DECREMENT_STOCK = "UPDATE products SET quantity = quantity - ? WHERE id = ? AND quantity >= ?"
+SQL_LIST_ORDERS = """
+    SELECT 
+        o.id, o.customer_name, o.date, o.total,
+        oi.quantity AS item_quantity,
+        oi.price_at_sale AS item_price_at_sale,
+        p.name AS item_name,
+        p.id AS item_product_id
+    FROM orders o
+    LEFT JOIN order_items oi ON oi.order_id = o.id
+    LEFT JOIN products p ON p.id = oi.product_id
+    ORDER BY o.date DESC, o.id, oi.id
+"""
+# Puts back every line of one order in a single statement (lines for the same product are summed);
+# both subqueries are answered from the covering order_items index
+SQL_REVERT_STOCK = """
+    UPDATE products
+    SET quantity = quantity + (
+        SELECT SUM(oi.quantity) FROM order_items oi
+        WHERE oi.order_id = :order_id AND oi.product_id = products.id
+    )
+    WHERE id IN (SELECT product_id FROM order_items WHERE order_id = :order_id)
+"""
+SQL_DELETE_ORDER = "DELETE FROM orders WHERE id = ?"
+
+@lru_cache(maxsize=None)
+def build_plant_update_sql(fields):
+    """Returns the UPDATE statement for a tuple of plant columns, built once per column sequence."""
+    set_clause = ", ".join(f"{field} = ?" for field in fields)
+    return f"UPDATE products SET {set_clause} WHERE id = ?"
+
+@lru_cache(maxsize=None)
+def build_supplier_update_sql(fields):
+    """Returns the UPDATE statement for a tuple of supplier columns, built once per column sequence."""
+    set_clause = ", ".join(f"{field} = ?" for field in fields)
+    return f"UPDATE suppliers SET {set_clause} WHERE id = ?"
+
+def chunks(seq, size):
+    """Splits a list into consecutive slices of at most size elements."""
+    return [seq[start:start + size] for start in range(0, len(seq), size)]
+
+@lru_cache(maxsize=64)
+def build_product_stock_sql(count):
+    """Returns the SELECT of price and stock for count product IDs, built once per ID count."""
+    placeholders = ', '.join('?' * count)
+    return f"SELECT id, price, quantity FROM products WHERE id IN ({placeholders})"
+
+@lru_cache(maxsize=64)
+def build_order_items_insert_sql(count):
+    """Returns one multi-row INSERT that adds count order_items rows in a single statement."""
+    values = ', '.join(['(?, ?, ?, ?)'] * count)
+    return f"INSERT INTO order_items (order_id, product_id, quantity, price_at_sale) VALUES {values}"
+
+@lru_cache(maxsize=64)
+def build_stock_decrement_sql(count):
+    """Returns one UPDATE ... FROM that decrements stock for count (product_id, quantity) pairs."""
+    values = ', '.join(['(?, ?)'] * count)
+    return f"""
+        WITH decrements(product_id, quantity) AS (VALUES {values})
+        UPDATE products SET quantity = products.quantity - decrements.quantity
+        FROM decrements
+        WHERE products.id = decrements.product_id AND products.quantity >= decrements.quantity
     """
-    params = []
-    
-    if search_term:
-        search_term = f"%{search_term}%"
-        query += " WHERE p.name LIKE ? OR p.category LIKE ? OR s.name LIKE ?"
-        params = [search_term, search_term, search_term]
 
-    cursor.row_factory = dict_factory
-    products = cursor.execute(query, params).fetchall()
-    return products
+# --- RESPONSE CACHING (ETAGS) ---
+
+# Random per-run prefix so ETags handed out before a restart never match this process
+_ETAG_PREFIX = os.urandom(4).hex()
+_etag_counter = count()
+# Current ETag per cacheable collection; bumped after any committed write that changes it
+_current_etags = {}
+# lru_cache'd body builders keyed by a collection's ETag, emptied whenever that ETag moves on
+_etag_memos = {}
+
+def bump_etag(resource):
+    """Assigns a fresh ETag to a cached collection ('plants' or 'suppliers')."""
+    _current_etags[resource] = f"{_ETAG_PREFIX}-{next(_etag_counter):x}"
+    memo = _etag_memos.get(resource)
+    if memo is not None:
+        # Bodies cached under the old ETag can never be served again; free them now
+        memo.cache_clear()
+
+bump_etag('plants')
+bump_etag('suppliers')
+
+def load_row_counts():
+    """Counts the rows of each cached collection, so empty listings can skip SQL entirely."""
+    with borrow_conn() as conn:
+        return {
+            'plants': conn.execute(SQL_COUNT_PRODUCTS).fetchone()[0],
+            'suppliers': conn.execute(SQL_COUNT_SUPPLIERS).fetchone()[0],
+        }
+
+# Row count per cached collection; @transactional discards a request's changes when it rolls back,
+# so only committed inserts/deletes reach it
+_row_counts = load_row_counts()
+_row_counts_lock = threading.Lock()
+
+def invalidate(*resources):
+    """Marks collections as changed; their ETags are bumped once the response is built."""
+    g.setdefault('stale_resources', set()).update(resources)
+
+def adjust_row_count(resource, delta):
+    """Records a row count change for a collection, applied once the response is built."""
+    g.setdefault('row_count_deltas', []).append((resource, delta))
+
+@app.after_request
+def bump_stale_etags(response):
+    """Bumps ETags for collections changed by this request, after its transaction has committed."""
+    # Counts are updated before the ETags so a new ETag never pairs with a stale count
+    deltas = g.pop('row_count_deltas', ())
+    if deltas:
+        with _row_counts_lock:
+            for resource, delta in deltas:
+                _row_counts[resource] += delta
+    for resource in g.pop('stale_resources', ()):
+        bump_etag(resource)
+    return response
+
+def empty_json_response():
+    """Returns a prebuilt '[]' response for a collection known to have no rows."""
+    return app.response_class(b'[]', status=200, mimetype='application/json')
+
+def not_modified(etag):
+    """Returns a 304 response if the client already holds etag, otherwise None."""
+    # Weak comparison, as If-None-Match requires: gzipped responses carry W/ ETags
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def with_etag(response, etag):
+    """Tags a GET response so clients can revalidate it cheaply with If-None-Match."""
+    response.set_etag(etag)
+    # no-cache: clients may store the body but must revalidate, so edits show up immediately
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # --- 1. PLANT CRUD ENDPOINTS (Inventory) ---
 
+@lru_cache(maxsize=128)
+def get_plants_json(etag, search_term):
+    """Returns the serialized GET /plants body, memoized per catalog version and search term.
+
+    etag only keys the cache: bumping the plants ETag clears it, so stale catalogs are not
+    kept around until they age out of the LRU.
+    """
+    # Only filter in SQL when a search term is given, so the plain listing skips the LIKE scan
+    if PLANT_SEARCH_USES_FTS and len(search_term) >= FTS_MIN_TERM_LENGTH:
+        # Quoted as one FTS5 phrase: a case-insensitive substring match on name or category,
+        # answered from the trigram index instead of scanning every product
+        phrase = '"' + search_term.replace('"', '""') + '"'
+        query, params = SQL_SEARCH_PLANTS_FTS, (phrase,)
+    elif search_term:
+        pattern = f"%{search_term}%"
+        query, params = SQL_SEARCH_PLANTS, (pattern, pattern)
+    else:
+        query, params = SQL_GET_PLANTS, ()
+    
+    with borrow_conn() as conn:
+        plants = fetch_dicts(conn.execute(query, params))
+    
+    return orjson.dumps(plants)
+
+_etag_memos['plants'] = get_plants_json
+
 @app.route('/plants', methods=['GET'])
 def get_plants():
     """Fetches all plants, including the supplier name via JOIN, with optional search."""
     search_term = request.args.get('search', '')
     
-    query = """
-    SELECT 
-        p.id, p.name, p.category, p.price, p.quantity, p.supplier_id, s.name AS supplier_name 
-    FROM products p
-    LEFT JOIN suppliers s ON p.supplier_id = s.id
-    WHERE p.name LIKE ? OR p.category LIKE ?
-    """
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # The ETag covers every search variant, since any plant write may change any result set
+    etag = _current_etags['plants']
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    # We set the row_factory to dict_factory for this query to ensure consistency
-    cursor.row_factory = dict_factory
+    # An empty catalog needs no SQL or serialization, whatever the search term
+    if _row_counts['plants'] == 0:
+        return with_etag(empty_json_response(), etag)
     
-    # Execute query with search terms
-    plants = cursor.execute(query, ('%' + search_term + '%', '%' + search_term + '%')).fetchall()
-    conn.close()
-    
-    return jsonify(plants)
+    body = get_plants_json(etag, search_term)
+    return with_etag(app.response_class(body, status=200, mimetype='application/json'), etag)
 
 @app.route('/plants', methods=['POST'])
-def add_plant():
+@transactional(body=PlantIn)
+def add_plant(cursor, plant):
     """Adds a new plant entry, including the supplier_id foreign key."""
-    data = request.get_json()
-    
-    supplier_id = data.get('supplier_id') 
+    cursor.execute(SQL_INSERT_PRODUCT, PLANT_INSERT_PARAMS(plant))
+    invalidate('plants')
+    adjust_row_count('plants', 1)
+    return ojsonify({'message': 'Plant added successfully', 'id': cursor.lastrowid}, 201)
 
-    if not data.get('name') or not data.get('category') or data.get('price') is None:
-        return jsonify({'error': 'Missing required fields: name, category, or price.'}), 400
 
-    query = """
-    INSERT INTO products (name, category, price, quantity, supplier_id) 
-    VALUES (?, ?, ?, ?, ?)
-    """
-    
-    conn = get_db_connection()
-    try:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute(query, (
-                data['name'], 
-                data['category'], 
-                data['price'], 
-                data.get('quantity', 0), 
-                supplier_id
-            ))
-            plant_id = cursor.lastrowid
-            return jsonify({'message': 'Plant added successfully', 'id': plant_id}), 201
-    except sqlite3.IntegrityError as e:
-        return jsonify({'error': f'Data integrity error: {e}'}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+def decode_plant_rows():
+    """Parses a POST /plants/bulk body (JSON array, or CSV with a header row) into PlantIn structs."""
+    if request.mimetype == 'text/csv':
+        # utf-8-sig drops the BOM Excel's "CSV UTF-8" export writes, which would otherwise prefix the first header
+        text = request.get_data().decode('utf-8-sig', errors='replace')
+        reader = csv.DictReader(io.StringIO(text))
+        # Blank cells count as not given, so optional columns fall back to their defaults
+        rows = [{k: v for k, v in row.items() if k is not None and v != ''} for row in reader]
+        try:
+            # strict=False lets numeric columns be converted from their CSV text
+            plants = msgspec.convert(rows, list[PlantIn], strict=False)
+        except msgspec.ValidationError as e:
+            abort(ojsonify({"error": f"Invalid request body: {e}"}, 400))
+    else:
+        plants = decode_request(list[PlantIn])
+    if not plants:
+        abort(ojsonify({"error": "No plants provided."}, 400))
+    return plants
 
+@app.route('/plants/bulk', methods=['POST'])
+def add_plants_bulk():
+    """Adds many plants in one transaction; any invalid or duplicate row rejects the whole batch."""
+    # Parsed and validated before the write transaction starts
+    return insert_plants(decode_plant_rows())
 
-@app.route('/plants/<int:plant_id>', methods=['PUT'])
-def update_plant(plant_id):
-    """Updates an existing plant's details, including the supplier_id."""
-    data = request.get_json()
-    updates = []
-    values = []
+@transactional()
+def insert_plants(cursor, plants):
+    """Inserts a validated batch of plants for POST /plants/bulk."""
+    # One prepared INSERT stepped once per row, all inside a single commit
+    cursor.executemany(SQL_INSERT_PRODUCT, map(PLANT_INSERT_PARAMS, plants))
+    invalidate('plants')
+    adjust_row_count('plants', len(plants))
+    return ojsonify({"message": "Plants added successfully", "count": len(plants)}, 201)
 
-    fields = ['name', 'category', 'price', 'quantity', 'supplier_id'] 
 
-    for field in fields:
-        if field in data:
-            updates.append(f"{field} = ?") 
-            values.append(data[field])
+@app.route('/plants/<int:plant_id>', methods=['PUT'])
+@transactional(body=PlantUpdateIn)
+def update_plant(cursor, data, plant_id):
+    """Updates an existing plant's details, including the supplier_id."""
+    # Unknown keys are ignored; sent fields are type-checked during decoding
+    fields = sent_fields(data)
 
-    if not updates:
-        return jsonify({'message': 'No fields provided for update'}), 200
+    if not fields:
+        return ojsonify({'message': 'No fields provided for update'}, 200)
 
-    query = f"UPDATE products SET {', '.join(updates)} WHERE id = ?"
+    values = [getattr(data, field) for field in fields]
     values.append(plant_id) 
 
-    conn = get_db_connection()
-    try:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute(query, tuple(values))
-            if cursor.rowcount == 0:
-                return jsonify({"error": "Plant not found"}), 404
-            return jsonify({'message': 'Plant updated successfully'}), 200
-    except sqlite3.IntegrityError as e:
-        return jsonify({'error': f'Data integrity error: {e}'}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    cursor.execute(build_plant_update_sql(fields), values)
+    if cursor.rowcount == 0:
+        return ojsonify({"error": "Plant not found"}, 404)
+    invalidate('plants')
+    return ojsonify({'message': 'Plant updated successfully'}, 200)
 
 @app.route('/plants/<int:plant_id>', methods=['DELETE'])
-def delete_plant(plant_id):
+# foreign_keys is enforced, so ON DELETE RESTRICT protects order history
+@transactional(errors={sqlite3.IntegrityError: (409, "Cannot delete plant. It is referenced by existing orders.")})
+def delete_plant(cursor, plant_id):
     """Deletes a plant entry."""
-    conn = get_db_connection()
-    try:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM products WHERE id = ?", (plant_id,))
-            if cursor.rowcount == 0:
-                return jsonify({"error": "Plant not found"}), 404
-            return jsonify({"message": "Plant deleted successfully"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close() 
+    cursor.execute(SQL_DELETE_PRODUCT, (plant_id,))
+    if cursor.rowcount == 0:
+        return ojsonify({"error": "Plant not found"}, 404)
+    invalidate('plants')
+    adjust_row_count('plants', -1)
+    return ojsonify({"message": "Plant deleted successfully"}, 200)
 
 # --- 2. SUPPLIER CRUD ENDPOINTS ---
 
+@lru_cache(maxsize=1)
+def get_suppliers_json(etag):
+    """Returns the serialized GET /suppliers body, memoized per supplier-list version."""
+    with borrow_conn() as conn:
+        return orjson.dumps(fetch_dicts(conn.execute(SQL_LIST_SUPPLIERS)))
+
+_etag_memos['suppliers'] = get_suppliers_json
+
 @app.route('/suppliers', methods=['GET'])
 def list_suppliers():
     """Returns a list of all suppliers."""
-    conn = get_db_connection()
-    conn.row_factory = dict_factory
+    etag = _current_etags['suppliers']
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    if _row_counts['suppliers'] == 0:
+        return with_etag(empty_json_response(), etag)
+
     try:
-        suppliers = conn.execute('SELECT * FROM suppliers').fetchall()
-        return jsonify(suppliers)
+        # Repeat GETs without If-None-Match reuse the bytes until a supplier write bumps the ETag
+        body = get_suppliers_json(etag)
+        return with_etag(app.response_class(body, status=200, mimetype='application/json'), etag)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/suppliers', methods=['POST'])
-def add_supplier():
+@transactional(body=SupplierIn)
+def add_supplier(cursor, supplier):
     """Adds a new supplier to the database."""
-    data = request.get_json()
-    name = data.get('name')
-    email = data.get('email')
-    contact_person = data.get('contact_person')
-    phone = data.get('phone')
-    address = data.get('address')
-
-    if not all([name, email]):
-        return jsonify({"error": "Missing required fields: name, email."}), 400
-
-    conn = get_db_connection()
-    try:
-        with conn: # <--- Transaction handles commit/rollback
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO suppliers (name, email, contact_person, phone, address) VALUES (?, ?, ?, ?, ?)",
-                (name, email, contact_person, phone, address)
-            )
-            return jsonify({"id": cursor.lastrowid, "message": "Supplier added successfully"}), 201
-    except sqlite3.IntegrityError as e:
-        # Handles UNIQUE constraints (like name or email already existing)
-        return jsonify({"error": f"Data integrity error: {e}"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    cursor.execute(SQL_INSERT_SUPPLIER, SUPPLIER_INSERT_PARAMS(supplier))
+    # rowcount 0: the NOT EXISTS guard found a supplier with this name or email, so no row was inserted
+    if cursor.rowcount == 0:
+        taken = 'name' if cursor.execute(SQL_SUPPLIER_NAME_TAKEN, (supplier.name,)).fetchone() else 'email'
+        # Same wording SQLite's IntegrityError used, so clients see an unchanged message
+        return ojsonify({"error": f"Data integrity error: UNIQUE constraint failed: suppliers.{taken}"}, 400)
+    invalidate('suppliers')
+    adjust_row_count('suppliers', 1)
+    return ojsonify({"id": cursor.lastrowid, "message": "Supplier added successfully"}, 201)
 
 @app.route('/suppliers/<int:supplier_id>', methods=['PUT'])
-def update_supplier(supplier_id):
+@transactional(body=SupplierUpdateIn)
+def update_supplier(cursor, data, supplier_id):
     """Updates an existing supplier's details."""
-    data = request.get_json()
-    conn = get_db_connection()
-    
-    update_fields = {k: v for k, v in data.items() if k in ['name', 'email', 'contact_person', 'phone', 'address']}
+    fields = sent_fields(data)
     
-    if not update_fields:
-        return jsonify({"error": "No valid fields provided for update."}), 400
+    if not fields:
+        return ojsonify({"error": "No valid fields provided for update."}, 400)
 
-    set_clauses = [f"{k} = ?" for k in update_fields.keys()]
-    set_clause_str = ", ".join(set_clauses)
-    values = list(update_fields.values())
+    values = [getattr(data, k) for k in fields]
     values.append(supplier_id) # The ID is the last parameter
 
-    try:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute(f"UPDATE suppliers SET {set_clause_str} WHERE id = ?", values)
-            if cursor.rowcount == 0:
-                return jsonify({"error": "Supplier not found"}), 404
-            return jsonify({"message": "Supplier updated successfully"}), 200
-    except sqlite3.IntegrityError as e:
-        return jsonify({"error": f"Data integrity error: {e}"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    # Same SQL text for the same field set, so sqlite3's statement cache can reuse the prepared statement
+    cursor.execute(build_supplier_update_sql(fields), values)
+    if cursor.rowcount == 0:
+        return ojsonify({"error": "Supplier not found"}, 404)
+    # Plants embed the supplier name, so their cached listing is stale too
+    invalidate('suppliers', 'plants')
+    return ojsonify({"message": "Supplier updated successfully"}, 200)
 
 
 @app.route('/suppliers/<int:supplier_id>', methods=['DELETE'])
-def delete_supplier(supplier_id):
+@transactional()
+def delete_supplier(cursor, supplier_id):
     """Deletes a supplier if no products are linked."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        with conn: # <--- Transaction handles commit/rollback
-            # Check for linked products (crucial for foreign key integrity)
-            linked_products = cursor.execute("SELECT COUNT(*) FROM products WHERE supplier_id=?", (supplier_id,)).fetchone()[0]
-            if linked_products > 0:
-                return jsonify({"error": f"Cannot delete supplier. {linked_products} plants are still linked. Please update or delete them first."}), 409
-
-            cursor.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
-            if cursor.rowcount == 0:
-                return jsonify({"error": "Supplier not found"}), 404
-            return jsonify({"message": "Supplier deleted successfully"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    # Linked products block the delete (crucial for foreign key integrity); the happy path is one statement
+    cursor.execute(SQL_DELETE_UNLINKED_SUPPLIER, {'supplier_id': supplier_id})
+    if cursor.rowcount == 0:
+        # Nothing deleted: either the supplier is still linked or it does not exist
+        linked_products = cursor.execute(SQL_COUNT_SUPPLIER_PRODUCTS, (supplier_id,)).fetchone()[0]
+        if linked_products > 0:
+            return ojsonify({"error": f"Cannot delete supplier. {linked_products} plants are still linked. Please update or delete them first."}, 409)
+        return ojsonify({"error": "Supplier not found"}, 404)
+    invalidate('suppliers', 'plants')
+    adjust_row_count('suppliers', -1)
+    return ojsonify({"message": "Supplier deleted successfully"}, 200)
 
 
 # --- 3. INVENTORY & RESTOCK ENDPOINTS ---
 
 @app.route('/inventory/restock', methods=['POST'])
-def restock_plant():
-    data = request.get_json()
-    product_id = data.get('product_id')
-    quantity = data.get('quantity')
-    
-    if not all([product_id, quantity is not None]):
-        return jsonify({"error": "Missing required fields: product_id and quantity."}), 400
+@transactional(body=RestockIn)
+def restock_plant(cursor, data):
+    product_id = data.product_id
+    quantity = data.quantity
         
     # 💥 FIX: Removed the check for quantity <= 0. Negative quantity is now allowed.
     # The frontend is now responsible for handling positive/negative intent (restock/write-off).
 
-    conn = get_db_connection()
-    try:
-        with conn: # <--- Transaction handled by context manager
-            cursor = conn.cursor()
-            
-            # This query handles both positive (restock: quantity + X) 
-            # and negative (write-off: quantity + (-X)) quantities correctly.
-            cursor.execute(
-                "UPDATE products SET quantity = quantity + ? WHERE id = ?",
-                (quantity, product_id)
-            )
-            if cursor.rowcount == 0:
-                return jsonify({"error": "Product not found"}), 404
-                
-            # Fetch the new quantity to confirm the update
-            cursor.row_factory = dict_factory
-            new_qty = cursor.execute("SELECT quantity FROM products WHERE id = ?", (product_id,)).fetchone()['quantity']
+    # This query handles both positive (restock: quantity + X) 
+    # and negative (write-off: quantity + (-X)) quantities correctly.
+    if SQLITE_HAS_RETURNING:
+        # One statement both applies the change and reports the new quantity
+        row = cursor.execute(SQL_RESTOCK_RETURNING, (quantity, product_id)).fetchone()
+        if row is None:
+            return ojsonify({"error": "Product not found"}, 404)
+        new_qty = row[0]
+    else:
+        cursor.execute(SQL_RESTOCK, (quantity, product_id))
+        if cursor.rowcount == 0:
+            return ojsonify({"error": "Product not found"}, 404)
             
-            return jsonify({"message": "Product restocked successfully", "new_quantity": new_qty}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+        # Fetch the new quantity to confirm the update
+        new_qty = cursor.execute(SQL_GET_PRODUCT_QUANTITY, (product_id,)).fetchone()[0]
+    
+    invalidate('plants')
+    return ojsonify({"message": "Product restocked successfully", "new_quantity": new_qty}, 200)
 
 
 # --- 4. ORDER MANAGEMENT ENDPOINTS ---
 
 @app.route('/orders', methods=['POST'])
-def create_order():
-    data = request.get_json()
-    customer_name = data.get('customer_name')
-    items = data.get('items') # List of {'product_id': int, 'quantity': int}
+# Schema validation rejects missing names, empty item lists and non-positive IDs/quantities
+@transactional(body=OrderIn, errors={
+    (ValueError, LookupError, sqlite3.IntegrityError): (400, "Order creation failed: {e}"),
+    Exception: (500, "An unexpected server error occurred: {e}"),
+})
+def create_order(cursor, order):
+    items = order.items
+    total = 0
+    order_items_data = []
 
-    if not all([customer_name, items]):
-        return jsonify({"error": "Missing required fields: customer_name and items."}), 400
+    # Lines for the same product are summed up front: stock is checked against the
+    # combined quantity, and UPDATE ... FROM applies only one joined row per target row.
+    decrements = {}
+    for item in items:
+        decrements[item.product_id] = decrements.get(item.product_id, 0) + item.quantity
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 💥 FIX: CRITICAL LINE TO ENSURE DICT ACCESS (product['quantity']) WORKS RELIABLY
-    cursor.row_factory = dict_factory 
+    # 1. Fetch price and stock for every distinct ordered product in a single query
+    # (split only if an order is larger than one statement's parameter limit; likewise below)
+    products = {
+        product_id: (price, stock)
+        for ids in chunks(list(decrements), SQLITE_MAX_VARIABLES)
+        for product_id, price, stock in cursor.execute(build_product_stock_sql(len(ids)), ids)
+    }
+
+    # 2. Check stock per product in Python
+    for product_id, quantity in decrements.items():
+        product = products.get(product_id)
+        
+        if not product:
+            raise LookupError(f"Product with ID {product_id} not found.")
+
+        stock = product[1]
+        if stock < quantity:
+            raise ValueError(f"Insufficient stock for product ID {product_id}. Available: {stock}, Requested: {quantity}")
+
+    # Calculate total and the order_items rows, one per requested line
+    for item in items:
+        price_at_sale = products[item.product_id][0]
+        total += price_at_sale * item.quantity
+        order_items_data.append((item.product_id, item.quantity, price_at_sale))
+
+    # 3. Insert into orders table
+    current_date = datetime.now().isoformat()
+    cursor.execute(SQL_INSERT_ORDER, (order.customer_name, current_date, total))
+    order_id = cursor.lastrowid
+
+    # 4. Insert all order_items rows with one multi-row INSERT (4 parameters per row)
+    for rows in chunks(order_items_data, SQLITE_MAX_VARIABLES // 4):
+        cursor.execute(
+            build_order_items_insert_sql(len(rows)),
+            [value for product_id, quantity, price_at_sale in rows
+             for value in (order_id, product_id, quantity, price_at_sale)]
+        )
     
-    total = 0
-    order_items_data = []
+    # 🟢 STOCK DECREMENT: This is the logic that reduces the stock.
+    # The UPDATE only touches rows that still have enough stock, so the write itself
+    # re-checks the condition; any skipped row aborts (and rolls back) the order.
+    # total_changes is used because cursor.rowcount stays -1 for WITH ... UPDATE.
+    changes_before = cursor.connection.total_changes
+    if SQLITE_HAS_UPDATE_FROM:
+        # 2 parameters per (product_id, quantity) pair
+        for pairs in chunks(list(decrements.items()), SQLITE_MAX_VARIABLES // 2):
+            cursor.execute(build_stock_decrement_sql(len(pairs)), [value for pair in pairs for value in pair])
+    else:
+        cursor.executemany(
+            SQL_DECREMENT_STOCK,
+            [(quantity, product_id, quantity) for product_id, quantity in decrements.items()]
+        )
+    if cursor.connection.total_changes - changes_before != len(decrements):
+        raise ValueError("Stock changed while the order was being placed.")
 
-    try:
-        with conn: # <--- TRANSACTION BLOCK START
-            # 1. Validate stock and calculate total
-            for item in items:
-                product_id = item.get('product_id')
-                quantity = item.get('quantity')
-                
-                if not product_id or not quantity or quantity <= 0:
-                    raise ValueError("Invalid product ID or quantity in order items.")
-
-                # Fetch product details and check stock
-                product = cursor.execute("SELECT price, quantity FROM products WHERE id=?", (product_id,)).fetchone()
-                
-                if not product:
-                    raise LookupError(f"Product with ID {product_id} not found.")
-
-                if product['quantity'] < quantity:
-                    raise ValueError(f"Insufficient stock for product ID {product_id}. Available: {product['quantity']}, Requested: {quantity}")
-                    
-                price_at_sale = product['price']
-                line_total = price_at_sale * quantity
-                total += line_total
-                order_items_data.append({
-                    'product_id': product_id,
-                    'quantity': quantity,
-                    'price_at_sale': price_at_sale
-                })
-
-            # 2. Insert into orders table
-            current_date = datetime.now().isoformat()
-            cursor.execute(
-                "INSERT INTO orders (customer_name, date, total) VALUES (?, ?, ?)",
-                (customer_name, current_date, total)
-            )
-            order_id = cursor.lastrowid
-
-            # 3. Insert into order_items table and update stock
-            for item in order_items_data:
-                cursor.execute(
-                    "INSERT INTO order_items (order_id, product_id, quantity, price_at_sale) VALUES (?, ?, ?, ?)",
-                    (order_id, item['product_id'], item['quantity'], item['price_at_sale'])
-                )
-                
-                # 🟢 STOCK DECREMENT: This is the logic that reduces the stock
-                cursor.execute(
-                    "UPDATE products SET quantity = quantity - ? WHERE id = ?",
-                    (item['quantity'], item['product_id'])
-                )
-
-            # COMMIT is automatic upon exiting the 'with conn:' block successfully
-            return jsonify({"id": order_id, "total": total, "message": "Order created successfully"}), 201
-
-    except (ValueError, LookupError, sqlite3.IntegrityError) as e:
-        # ROLLBACK is automatic if an exception is raised
-        return jsonify({"error": f"Order creation failed: {e}"}), 400
-    except Exception as e:
-        # ROLLBACK is automatic for unexpected errors
-        return jsonify({"error": f"An unexpected server error occurred: {e}"}), 500
-    finally:
-        conn.close() # Connection is closed after the transaction
+    # Stock levels changed, so the plant listing is stale
+    invalidate('plants')
+    # COMMIT happens when the endpoint returns; any exception above rolls the order back
+    return ojsonify({"id": order_id, "total": total, "message": "Order created successfully"}, 201)
+
+def iter_orders(rows):
+    """Groups joined order/item rows (sorted by order) into order dicts, yielding one order at a time."""
+    for _, order_rows in groupby(rows, key=itemgetter(0)):
+        # The order columns repeat on every joined row, so they are read from the first one only
+        first = next(order_rows)
+        order_id, customer_name, date, total = first[:4]
+        # Orders without items produce a single row with NULL item columns
+        items = [] if first[4] is None else [
+            {'quantity': quantity, 'price_at_sale': price_at_sale, 'name': name, 'product_id': product_id}
+            for *_, quantity, price_at_sale, name, product_id in chain((first,), order_rows)
+        ]
+        yield {
+            'id': order_id,
+            'customer_name': customer_name,
+            'date': date,
+            'total': total,
+            'items': items
+        }
+
+# Orders are serialized one at a time but sent in chunks of roughly this many bytes,
+# so the WSGI server does a handful of socket writes instead of one per order
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def generate_orders_json():
+    """Yields the GET /orders JSON array piece by piece while the cursor is still being read."""
+    with borrow_conn() as conn:
+        # Single JOIN instead of one item query per order (avoids N+1 round-trips)
+        rows = conn.execute(SQL_LIST_ORDERS)
+        buffer = bytearray(b'[')
+        separator = b''
+        for order in iter_orders(rows):
+            buffer += separator
+            buffer += orjson.dumps(order)
+            separator = b','
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b']'
+        yield bytes(buffer)
 
 @app.route('/orders', methods=['GET'])
 def list_orders():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.row_factory = dict_factory
-    
-    try:
-        # Fetch all orders
-        orders = cursor.execute("SELECT * FROM orders ORDER BY date DESC").fetchall()
-        
-        # Fetch items for each order
-        for order in orders:
-            order_items = cursor.execute("""
-                SELECT 
-                    oi.quantity, 
-                    oi.price_at_sale, 
-                    p.name, 
-                    p.id as product_id
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.id
-                WHERE oi.order_id = ?
-            """, (order['id'],)).fetchall()
-            
-            order['items'] = order_items
-            
-        return jsonify(orders)
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    """Returns all orders (newest first), each with its line items, as a streamed JSON array."""
+    # Only one order is held in memory at a time, and bytes reach the client before the query finishes
+    if accepts_gzip():
+        body = gzip_stream(generate_orders_json())
+        return mark_gzipped(app.response_class(stream_with_context(body), mimetype='application/json'))
+    return app.response_class(stream_with_context(generate_orders_json()), mimetype='application/json')
 
 @app.route('/orders/<int:order_id>', methods=['DELETE'])
-def delete_order(order_id):
+@transactional(errors={
+    LookupError: (404, "{e}"),
+    Exception: (500, "Error deleting order: {e}"),
+})
+def delete_order(cursor, order_id):
     """Deletes an order, including its items, and reverts stock."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # 1. 🟢 STOCK REVERSION: This logic puts the stock back, for all items at once
+    # (a missing order has no items, so this touches nothing)
+    cursor.execute(SQL_REVERT_STOCK, {'order_id': order_id})
+        
+    # 2. Delete order from orders and order_items table (ON DELETE CASCADE handles order_items)
+    cursor.execute(SQL_DELETE_ORDER, (order_id,))
+    if cursor.rowcount == 0:
+        # Rolls the (empty) transaction back and answers 404
+        raise LookupError("Order not found")
     
-    # We set the factory here to allow key-based access to the fetched item data
-    cursor.row_factory = dict_factory
-
-    try:
-        with conn: # <--- TRANSACTION BLOCK START
-            
-            # 1. Get order items to revert stock
-            items = cursor.execute("SELECT product_id, quantity FROM order_items WHERE order_id=?", (order_id,)).fetchall()
-            
-            # Check if the order itself exists
-            order_exists = cursor.execute("SELECT COUNT(*) FROM orders WHERE id=?", (order_id,)).fetchone()['COUNT(*)']
-            if order_exists == 0:
-                raise LookupError("Order not found")
-
-            # 2. Revert stock for each item
-            for item in items:
-                product_id = item['product_id']
-                quantity_revert = item['quantity']
-                
-                # 🟢 STOCK REVERSION: This logic puts the stock back
-                cursor.execute("""
-                    UPDATE products SET quantity = quantity + ? WHERE id = ?
-                """, (quantity_revert, product_id))
-                
-            # 3. Delete order from orders and order_items table (ON DELETE CASCADE handles order_items)
-            cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
-            
-            # COMMIT is automatic upon exiting the 'with conn:' block successfully
-            return jsonify({"message": "Order deleted and stock reverted successfully"}), 200
-
-    except LookupError as e:
-        return jsonify({"error": str(e)}), 404
-    except Exception as e:
-        # ROLLBACK is automatic
-        return jsonify({"error": f"Error deleting order: {e}"}), 500
-    finally:
-        conn.close()
+    invalidate('plants')
+    return ojsonify({"message": "Order deleted and stock reverted successfully"}, 200)
 
 # --- RUN SERVER ---
 
+# Server bind address (the Flutter client expects http://127.0.0.1:5000)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5000
+# One worker thread per pooled read connection, so reads never queue on the pool
+SERVER_THREADS = POOL_SIZE
+# waitress multiplexes socket I/O on its own event loop and only hands complete requests to the
+# worker threads, so it can hold far more open client connections than there are threads
+SERVER_CONNECTION_LIMIT = 1000
+SERVER_BACKLOG = 2048
+
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    if os.getenv('NURSERY_API_DEBUG') == '1':
+        # Werkzeug development server with debugger/reloader, for local development only
+        app.run(host=SERVER_HOST, port=SERVER_PORT, debug=True)
+    else:
+        # Production WSGI server; runs on Windows, where the packaged api_server.exe is used.
+        # See wsgi.py for serving the app with gunicorn or waitress-serve instead.
+        serve(
+            app,
+            host=SERVER_HOST,
+            port=SERVER_PORT,
+            threads=SERVER_THREADS,
+            connection_limit=SERVER_CONNECTION_LIMIT,
+            backlog=SERVER_BACKLOG
+        )
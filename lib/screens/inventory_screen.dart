@@ -1,3 +1,5 @@
+import 'dart:async';
+
 import 'package:flutter/material.dart';
 import '../models/plant.dart';
 import '../services/api_service.dart';
@@ -14,6 +16,9 @@ class _InventoryScreenState extends State<InventoryScreen> {
   final ApiService _apiService = ApiService();
   late Future<List<Plant>> _plantsFuture;
   final TextEditingController _searchController = TextEditingController();
+  // Typing a word fires one request once the user pauses, not one per keystroke
+  static const Duration _searchDebounce = Duration(milliseconds: 250);
+  Timer? _searchTimer;
 
   @override
   void initState() {
@@ -22,6 +27,13 @@ class _InventoryScreenState extends State<InventoryScreen> {
     _plantsFuture = _fetchPlants(); 
   }
 
+  @override
+  void dispose() {
+    _searchTimer?.cancel();
+    _searchController.dispose();
+    super.dispose();
+  }
+
   // Function to fetch plants, called by initState, search, and navigation
   Future<List<Plant>> _fetchPlants({String? searchTerm}) async {
     try {
@@ -35,9 +47,13 @@ class _InventoryScreenState extends State<InventoryScreen> {
   }
 
   void _onSearchChanged(String value) {
-    setState(() {
-      // This setState triggers a new Future with the search term
-      _plantsFuture = _fetchPlants(searchTerm: value);
+    _searchTimer?.cancel();
+    _searchTimer = Timer(_searchDebounce, () {
+      if (!mounted) return;
+      setState(() {
+        // This setState triggers a new Future with the search term
+        _plantsFuture = _fetchPlants(searchTerm: value);
+      });
     });
   }
 
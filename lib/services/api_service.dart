@@ -9,6 +9,11 @@ import '../models/order.dart';
 const String baseUrl = 'http://127.0.0.1:5000';
 
 class ApiService {
+
+  // Last GET /suppliers result, shared by every ApiService instance.
+  // The server answers 304 to If-None-Match while the supplier list is unchanged.
+  static List<Supplier>? _cachedSuppliers;
+  static String? _suppliersEtag;
   
   // --- UTILITY ---
 
@@ -90,11 +95,24 @@ class ApiService {
 
   // GET /suppliers
   Future<List<Supplier>> fetchSuppliers() async {
-    final response = await http.get(Uri.parse('$baseUrl/suppliers'));
-    if (response.statusCode == 200) {
+    final cached = _cachedSuppliers;
+    final etag = _suppliersEtag;
+    final headers = <String, String>{};
+    if (cached != null && etag != null) {
+      headers['If-None-Match'] = etag;
+    }
+
+    final response = await http.get(Uri.parse('$baseUrl/suppliers'), headers: headers);
+    if (response.statusCode == 304 && cached != null) {
+      // Unchanged since the last fetch: reuse the decoded list
+      return List.of(cached);
+    } else if (response.statusCode == 200) {
       List<dynamic> data = json.decode(response.body);
       // Maps raw JSON list to List<Supplier>
-      return data.map((json) => Supplier.fromJson(json)).toList();
+      final suppliers = data.map((json) => Supplier.fromJson(json)).toList();
+      _cachedSuppliers = suppliers;
+      _suppliersEtag = response.headers['etag'];
+      return List.of(suppliers);
     } else {
       throw Exception('Failed to load suppliers: ${_extractErrorMessage(response)}');
     }
@@ -0,0 +1,15 @@
+"""WSGI entry point for serving the API with an external server.
+
+Linux / macOS (gunicorn, threaded workers):
+    gunicorn --workers 1 --threads 8 --worker-class gthread --bind 127.0.0.1:5000 wsgi:app
+
+Windows (waitress, same settings as running api_server.py directly):
+    waitress-serve --threads 8 --listen 127.0.0.1:5000 wsgi:app
+
+Keep a single worker process: the ETag versions and cached listings live in process memory,
+so separate processes would serve stale data. Scale with --threads instead; WAL mode lets the
+pooled connections read concurrently with the writer.
+"""
+from api_server import app
+
+__all__ = ['app']